@@ -2,43 +2,78 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import pickle
+import time
 from datetime import datetime
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Projection horizon: compounding exponents 1..5 for 2025–2029
+START_YEAR = 2025
+PROJECTION_YEARS = 5
+PROJECTION_EXPS = np.arange(1, PROJECTION_YEARS + 1)
+
+# On-disk cache for Yahoo Finance downloads (survives process restarts)
+CACHE_DIR = ".cache"
+# Statements change quarterly; info carries live prices/ratios, so it expires like st.cache_data
+STATEMENTS_TTL = 24 * 3600
+QUOTE_TTL = 3600
+
+# Widget keys for the fixed input labels (spaces -> "_", parentheses dropped)
+LABEL_KEYS = {
+    "Shares (in Million)": "Shares_in_Million",
+    "Last Price": "Last_Price",
+    "Pendapatan": "Pendapatan",
+    "Profit": "Profit",
+    "Equity": "Equity",
+    "ROE (Annual) (%)": "ROE_Annual_%",
+    "ROE (in 5 Years) (%)": "ROE_in_5_Years_%",
+    "EPS Growth (in 5 Years) (%)": "EPS_Growth_in_5_Years_%",
+    "SPS Growth (in 5 Years) (%)": "SPS_Growth_in_5_Years_%",
+    "Dividend Payout Ratio (DPR%)": "Dividend_Payout_Ratio_DPR%",
+    "Average PBV": "Average_PBV",
+    "Average PER": "Average_PER",
+    "Average PSR": "Average_PSR",
+}
+
 st.set_page_config(page_title="Fundamental Price Prediction", layout="wide")
 st.title("📊 Fundamental Price Prediction")
 
-ticker = st.text_input("Masukkan Kode Saham (contoh: BMRI.JK)", value="BMRI.JK").strip().upper()
+# Only submit the ticker on button press, so typing does not rerun the whole script
+with st.form("ticker_form"):
+    ticker = st.text_input("Masukkan Kode Saham (contoh: BMRI.JK)", value="BMRI.JK").strip().upper()
+    submitted = st.form_submit_button("Ambil Data")
 
-def safe_get(obj, key, default=0.0):
-    try:
-        if isinstance(obj, (pd.Series, pd.DataFrame)):
-            if key in obj.index:
-                val = obj[key]
-                return float(val) if pd.notna(val) and val is not None else default
-            else:
-                return default
-        else:
-            val = obj.get(key, default)
-            return float(val) if pd.notna(val) and val is not None else default
-    except:
+def _safe_get_dict(info, key, default=0.0):
+    # Fast path for the yfinance info dict: plain NaN check (NaN != NaN) instead of pd.notna
+    val = info.get(key, default)
+    if not isinstance(val, (int, float)):  # None, or strings such as 'Infinity'
         return default
+    return float(val) if val == val else default
+
+EQUITY_KEYS = (
+    'Total Stockholder Equity',
+    'Total Equity',
+    'Stockholders Equity',
+    'Total shareholders\' equity',
+    'Total Shareholders Equity',
+    'Ordinary Shares',
+    'Total liabilities and equity',
+)
+REVENUE_KEYS = ('Total Revenue', 'Revenue')
+NET_INCOME_KEYS = ('Net Income', 'Net Income Common Stockholders')
 
 def get_equity_from_balance_sheet(bs):
-    candidates = [
-        'Total Stockholder Equity',
-        'Total Equity',
-        'Stockholders Equity',
-        'Total shareholders\' equity',
-        'Total Shareholders Equity',
-        'Ordinary Shares',
-        'Total liabilities and equity'
-    ]
-    for key in candidates:
-        if key in bs.index:
-            series = bs.loc[key]
-            if not series.empty:
-                return series.iloc[0]
-    return 0
+    key = next((k for k in EQUITY_KEYS if k in bs.index), None)
+    if key is None or bs.shape[1] == 0:
+        return 0
+    return bs.loc[key].iloc[0]
 
 def get_from_financials(fin, key_list, idx=0):
     for k in key_list:
@@ -48,53 +83,175 @@ def get_from_financials(fin, key_list, idx=0):
                 return series.iloc[idx]
     return 0
 
+def _project_loop(bv, eps, sps, roe, eps_growth, sps_growth, pbv, per, psr):
+    # Columns: BV, Price (PBV), EPS, Price (PER), SPS, Price (PSR)
+    out = np.empty((PROJECTION_YEARS, 6))
+    for i in range(PROJECTION_YEARS):
+        bv *= 1 + roe
+        eps *= 1 + eps_growth
+        sps *= 1 + sps_growth
+        out[i, 0] = bv
+        out[i, 1] = bv * pbv
+        out[i, 2] = eps
+        out[i, 3] = eps * per
+        out[i, 4] = sps
+        out[i, 5] = sps * psr
+    return out
+
+def _project_numpy(bv, eps, sps, roe, eps_growth, sps_growth, pbv, per, psr):
+    bv_fv = bv * (1 + roe) ** PROJECTION_EXPS
+    eps_fv = eps * (1 + eps_growth) ** PROJECTION_EXPS
+    sps_fv = sps * (1 + sps_growth) ** PROJECTION_EXPS
+    return np.column_stack([bv_fv, bv_fv * pbv, eps_fv, eps_fv * per, sps_fv, sps_fv * psr])
+
+@st.cache_resource
+def load_projection_kernel():
+    # Built once per process rather than on every script rerun; NumPy if numba is unusable
+    if njit is None:
+        return _project_numpy
+    try:
+        kernel = njit('f8[:,:](f8,f8,f8,f8,f8,f8,f8,f8,f8)', cache=True)(_project_loop)
+        kernel(1.0, 1.0, 1.0, 0.1, 0.1, 0.1, 1.0, 1.0, 1.0)
+    except Exception:
+        return _project_numpy
+    return kernel
+
+project = load_projection_kernel()
+
+class FileCache:
+    """Pickle-based disk cache; each entry stores (timestamp, value)."""
+
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError:
+            # e.g. read-only working directory: run without a disk cache
+            self.directory = None
+
+    def _path(self, key):
+        digest = hashlib.md5(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.pkl")
+
+    def get(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                timestamp, value = pickle.load(f)
+        except Exception:
+            # Missing, corrupt, or pickled under incompatible library versions: treat as a miss
+            return None
+        if time.time() - timestamp > self.ttl:
+            return None
+        return value
+
+    def set(self, key, value):
+        if self.directory is None:
+            return
+        try:
+            with open(self._path(key), "wb") as f:
+                pickle.dump((time.time(), value), f)
+        except OSError:
+            pass
+
+statements_cache = FileCache(CACHE_DIR, STATEMENTS_TTL)
+quote_cache = FileCache(CACHE_DIR, QUOTE_TTL)
+
+def download_ticker_data(ticker):
+    stock = yf.Ticker(ticker)
+    info = quote_cache.get(f"{ticker}:info")
+    statements = statements_cache.get(f"{ticker}:statements")
+
+    # The Yahoo endpoints are independent, so fetch whatever is missing concurrently
+    if info is None or statements is None:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            info_future = executor.submit(lambda: stock.info) if info is None else None
+            statement_futures = (
+                executor.submit(lambda: stock.financials),
+                executor.submit(lambda: stock.balance_sheet),
+            ) if statements is None else ()
+        if info_future is not None:
+            info = info_future.result()
+            quote_cache.set(f"{ticker}:info", info)
+        if statement_futures:
+            statements = tuple(f.result() for f in statement_futures)
+            # Do not pin an empty statement response on disk for the whole TTL
+            if not (statements[0].empty or statements[1].empty):
+                statements_cache.set(f"{ticker}:statements", statements)
+
+    financials, balance_sheet = statements
+
+    # info is still required for the growth/ratio fields; fast_info only fills in missing shares
+    if _safe_get_dict(info, 'sharesOutstanding', 0) == 0:
+        try:
+            shares = stock.fast_info.get('shares')
+        except Exception:
+            shares = None
+        if shares:
+            info = {**info, 'sharesOutstanding': shares}
+
+    # Price history is only a fallback for a missing currentPrice; a few days suffice
+    history = None
+    if _safe_get_dict(info, 'currentPrice', 0) == 0:
+        history = quote_cache.get(f"{ticker}:history")
+        if history is None:
+            history = stock.history(period="5d", interval="1d")
+            quote_cache.set(f"{ticker}:history", history)
+
+    return info, financials, balance_sheet, history
+
 @st.cache_data(ttl=3600)
 def fetch_fundamental_data(ticker):
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        financials = stock.financials
-        balance_sheet = stock.balance_sheet
-        history = stock.history(period="5y")
+        info, financials, balance_sheet, history = download_ticker_data(ticker)
 
         if financials.empty or balance_sheet.empty:
             return None
 
-        shares_outstanding = safe_get(info, 'sharesOutstanding', 0)
+        shares_outstanding = _safe_get_dict(info, 'sharesOutstanding', 0)
         shares = shares_outstanding / 1_000_000 if shares_outstanding > 0 else 0
-        last_price = safe_get(info, 'currentPrice', history['Close'].iloc[-1] if not history.empty else 0)
+        last_price = _safe_get_dict(info, 'currentPrice', history['Close'].iloc[-1] if history is not None and not history.empty else 0)
 
-        revenue = get_from_financials(financials, ['Total Revenue', 'Revenue'])
-        net_income = get_from_financials(financials, ['Net Income', 'Net Income Common Stockholders'])
+        revenue = get_from_financials(financials, REVENUE_KEYS)
+        net_income = get_from_financials(financials, NET_INCOME_KEYS)
         equity = get_equity_from_balance_sheet(balance_sheet)
 
         roe_annual = (net_income / equity * 100) if equity != 0 else 0
 
-        roes = []
-        for i in range(min(5, len(financials.columns))):
-            ni = get_from_financials(financials, ['Net Income'], i)
-            eq = get_equity_from_balance_sheet(balance_sheet.iloc[:, i:i+1])
-            if eq != 0:
-                roes.append(ni / eq * 100)
-        roe_5y = np.mean(roes) if roes else 0
+        # ROE per year over the last (up to) 5 reported periods, vectorized
+        n_years = min(5, len(financials.columns))
+        eq_key = next((k for k in EQUITY_KEYS if k in balance_sheet.index), None)
+        if 'Net Income' in financials.index and eq_key is not None:
+            ni_row = financials.loc['Net Income'].iloc[:n_years].to_numpy(dtype=float)
+            eq_row = balance_sheet.loc[eq_key].iloc[:n_years].to_numpy(dtype=float)
+            n = min(len(ni_row), len(eq_row))
+            ni_row, eq_row = ni_row[:n], eq_row[:n]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                roes = ni_row / np.where(eq_row != 0, eq_row, np.nan) * 100
+            roes = roes[~np.isnan(roes)]
+        else:
+            roes = np.empty(0)
+        roe_5y = float(roes.mean()) if roes.size else 0
 
-        eps_growth_5y = safe_get(info, 'earningsGrowth', 0) * 100
+        eps_growth_5y = _safe_get_dict(info, 'earningsGrowth', 0) * 100
         if eps_growth_5y == 0:
-            eps_growth_5y = safe_get(info, 'earningsQuarterlyGrowth', 0) * 100
+            eps_growth_5y = _safe_get_dict(info, 'earningsQuarterlyGrowth', 0) * 100
 
-        sps_growth_5y = safe_get(info, 'revenueGrowth', 0) * 100
+        sps_growth_5y = _safe_get_dict(info, 'revenueGrowth', 0) * 100
 
-        payout_ratio = safe_get(info, 'payoutRatio', 0) * 100
+        payout_ratio = _safe_get_dict(info, 'payoutRatio', 0) * 100
         if payout_ratio == 0:
-            dividend_yield = safe_get(info, 'dividendYield', 0)
-            eps = safe_get(info, 'trailingEps', 0)
+            dividend_yield = _safe_get_dict(info, 'dividendYield', 0)
+            eps = _safe_get_dict(info, 'trailingEps', 0)
             if dividend_yield > 0 and eps > 0:
                 dps = dividend_yield * last_price
                 payout_ratio = (dps / eps) * 100
 
-        avg_pbv = safe_get(info, 'priceToBook', 0)
-        avg_per = safe_get(info, 'trailingPE', 0)
-        avg_psr = safe_get(info, 'priceToSalesTrailing12Months', 0)
+        avg_pbv = _safe_get_dict(info, 'priceToBook', 0)
+        avg_per = _safe_get_dict(info, 'trailingPE', 0)
+        avg_psr = _safe_get_dict(info, 'priceToSalesTrailing12Months', 0)
 
         return {
             "Shares (in Million)": shares,
@@ -105,7 +262,6 @@ def fetch_fundamental_data(ticker):
             "ROE (Annual)": roe_annual,
             "ROE (in 5 Years)": roe_5y,
             "EPS Growth (in 5 Years)": eps_growth_5y,
-            "SPS Growth (Annual)": sps_growth_5y,
             "SPS Growth (in 5 Years)": sps_growth_5y,
             "Dividend Payout Ratio (DPR%)": payout_ratio,
             "Average PBV": avg_pbv,
@@ -116,13 +272,18 @@ def fetch_fundamental_data(ticker):
         st.warning(f"⚠️ Gagal mengambil data dari Yahoo Finance untuk `{ticker}`: {str(e)}")
         return None
 
-data = fetch_fundamental_data(ticker)
+# Reuse the last fetched payload on reruns triggered by other widgets
+if submitted or "fundamental_data" not in st.session_state:
+    st.session_state.fundamental_data = fetch_fundamental_data(ticker)
+    st.session_state.fetched_ticker = ticker
+data = st.session_state.fundamental_data
+ticker = st.session_state.fetched_ticker
 
 st.subheader("🔍 Data Fundamental")
 manual_mode = st.checkbox(" Gunakan input manual jika data otomatis tidak lengkap")
 
 def input_with_default(label, default_val, format="%.2f"):
-    key = label.replace(" ", "_").replace("(", "").replace(")", "")
+    key = LABEL_KEYS[label]
     if manual_mode:
         return st.number_input(label, value=float(default_val), format=format, key=f"manual_{key}")
     else:
@@ -135,7 +296,7 @@ if data is None:
     defaults = {k: 0.0 for k in [
         "Shares (in Million)", "Last Price", "Pendapatan", "Profit", "Equity",
         "ROE (Annual)", "ROE (in 5 Years)", "EPS Growth (in 5 Years)",
-        "SPS Growth (Annual)", "SPS Growth (in 5 Years)", "Dividend Payout Ratio (DPR%)",
+        "SPS Growth (in 5 Years)", "Dividend Payout Ratio (DPR%)",
         "Average PBV", "Average PER", "Average PSR"
     ]}
 else:
@@ -154,56 +315,98 @@ with col1:
     eps_growth_5y = input_with_default("EPS Growth (in 5 Years) (%)", defaults["EPS Growth (in 5 Years)"])
 
 with col2:
-    sps_growth_annual = input_with_default("SPS Growth (Annual) (%)", defaults["SPS Growth (Annual)"])
     sps_growth_5y = input_with_default("SPS Growth (in 5 Years) (%)", defaults["SPS Growth (in 5 Years)"])
     dpr = input_with_default("Dividend Payout Ratio (DPR%)", defaults["Dividend Payout Ratio (DPR%)"])
     avg_pbv = input_with_default("Average PBV", defaults["Average PBV"])
     avg_per = input_with_default("Average PER", defaults["Average PER"])
     avg_psr = input_with_default("Average PSR", defaults["Average PSR"])
 
+FUTURE_VALUE_COLUMNS = (
+    "BV Future Value",
+    "Future Price (PBV)",
+    "EPS Future Value",
+    "Future Price (PER)",
+    "SPS Future Value",
+    "Future Price (PSR)",
+)
+
+SUMMARY_METRICS = (
+    "Last Price (Saat Ini)",
+    "Future Price (2029)",
+    "G&L Potential (%)",
+    "Annual Return (%)",
+    "Margin of Safety (%)",
+    "CAGR (%)",
+)
+
+def compute_projection(shares, last_price, pendapatan, profit, equity, roe_5y, eps_growth_5y, sps_growth_5y, avg_pbv, avg_per, avg_psr):
+    # Current per-share metrics
+    shares_outstanding = shares * 1_000_000
+    book_value_per_share = equity / shares_outstanding if shares_outstanding > 0 else 0
+    eps_current = profit / shares_outstanding if shares_outstanding > 0 else 0
+    sps_current = pendapatan / shares_outstanding if shares_outstanding > 0 else 0
+
+    # Growth rates (as decimals)
+    roe = roe_5y / 100
+    eps_growth = eps_growth_5y / 100
+    sps_growth = sps_growth_5y / 100
+
+    # Projection years: 2025 to 2029 (5 years)
+    years = (START_YEAR + PROJECTION_EXPS - 1).astype(np.int16)  # [2025, 2026, 2027, 2028, 2029]
+
+    # Project future values (compounded annually); Future Price = Metric × Avg Multiple
+    # Returns a (5, 6) block whose columns follow FUTURE_VALUE_COLUMNS
+    projection = project(
+        float(book_value_per_share), float(eps_current), float(sps_current),
+        float(roe), float(eps_growth), float(sps_growth),
+        float(avg_pbv), float(avg_per), float(avg_psr),
+    )
+
+    # Create DataFrame from the single float block, rounded once for display
+    future_df = pd.DataFrame(projection.round(2), columns=list(FUTURE_VALUE_COLUMNS))
+    future_df.insert(0, "Tahun", years)
+
+    # Use 2029 (last year) future price average
+    price_2029_pbv, price_2029_per, price_2029_psr = projection[-1, 1], projection[-1, 3], projection[-1, 5]
+
+    # Statement cells can be NaN, so average only the finite multiples
+    future_price_final = np.nanmean([price_2029_pbv, price_2029_per, price_2029_psr])
+
+    # Avoid division by zero
+    gain_loss = ((future_price_final / last_price) - 1) * 100 if last_price > 0 else 0
+    margin_of_safety = max(0, (future_price_final - last_price) / future_price_final * 100) if future_price_final > 0 else 0
+    if last_price <= 0:
+        cagr = 0
+    elif future_price_final > 0:
+        cagr = (future_price_final / last_price) ** (1/5) - 1
+    else:
+        # No real 5th root for a non-positive price ratio: leave CAGR undefined
+        cagr = np.nan
+
+    values = np.array([
+        last_price,
+        future_price_final,
+        gain_loss,
+        gain_loss / 5,
+        margin_of_safety,
+        cagr * 100,
+    ], dtype=np.float64).round(2)
+    summary_df = pd.DataFrame({"Metric": list(SUMMARY_METRICS), "Value": values})
+    return future_df, summary_df
+
+future_df, summary_df = compute_projection(
+    float(shares), float(last_price), float(pendapatan), float(profit), float(equity),
+    float(roe_5y), float(eps_growth_5y), float(sps_growth_5y),
+    float(avg_pbv), float(avg_per), float(avg_psr),
+)
+
 # ==============================
 # ✅ FUTURE VALUE PROJECTION (2025–2029)
 # ==============================
 st.markdown("---")
 st.markdown(f"📈 Proyeksi Future Price (2025–2029) – <span style='color: green; font-weight: bold;'>{ticker}</span>", unsafe_allow_html=True)
 
-# Current per-share metrics
-shares_outstanding = shares * 1_000_000
-book_value_per_share = equity / shares_outstanding if shares_outstanding > 0 else 0
-eps_current = profit / shares_outstanding if shares_outstanding > 0 else 0
-sps_current = pendapatan / shares_outstanding if shares_outstanding > 0 else 0
-
-# Growth rates (as decimals)
-roe = roe_5y / 100
-eps_growth = eps_growth_5y / 100
-sps_growth = sps_growth_5y / 100
-
-# Projection years: 2025 to 2029 (5 years)
-start_year = 2025
-years = [start_year + i for i in range(5)]  # [2025, 2026, 2027, 2028, 2029]
-
-# Project future values (compounded annually)
-bv_fv = [book_value_per_share * ((1 + roe) ** (i + 1)) for i in range(5)]
-eps_fv = [eps_current * ((1 + eps_growth) ** (i + 1)) for i in range(5)]
-sps_fv = [sps_current * ((1 + sps_growth) ** (i + 1)) for i in range(5)]
-
-# Future Price = Metric × Avg Multiple
-price_pbv = [bv * avg_pbv for bv in bv_fv]
-price_per = [eps * avg_per for eps in eps_fv]
-price_psr = [sps * avg_psr for sps in sps_fv]
-
-# Create DataFrame
-future_df = pd.DataFrame({
-    "Tahun": years,
-    "BV Future Value": bv_fv,
-    "Future Price (PBV)": price_pbv,
-    "EPS Future Value": eps_fv,
-    "Future Price (PER)": price_per,
-    "SPS Future Value": sps_fv,
-    "Future Price (PSR)": price_psr,
-})
-
-st.dataframe(future_df.round(2), width='stretch')
+st.table(future_df)
 
 # ==============================
 # 🎯 SUMMARY & POTENTIAL
@@ -211,29 +414,7 @@ st.dataframe(future_df.round(2), width='stretch')
 st.markdown("---")
 st.subheader("🎯 Kesimpulan & Potensi Investasi")
 
-# Use 2029 (last year) future price average
-price_2029_pbv = future_df.iloc[-1]["Future Price (PBV)"]
-price_2029_per = future_df.iloc[-1]["Future Price (PER)"]
-price_2029_psr = future_df.iloc[-1]["Future Price (PSR)"]
-
-future_price_final = np.nanmean([price_2029_pbv, price_2029_per, price_2029_psr])
-
-# Avoid division by zero
-gain_loss = ((future_price_final / last_price) - 1) * 100 if last_price > 0 else 0
-margin_of_safety = max(0, (future_price_final - last_price) / future_price_final * 100) if future_price_final > 0 else 0
-cagr = (future_price_final / last_price) ** (1/5) - 1 if last_price > 0 else 0
-
-summary_data = {
-    "Last Price (Saat Ini)": last_price,
-    "Future Price (2029)": future_price_final,
-    "G&L Potential (%)": gain_loss,
-    "Annual Return (%)": gain_loss / 5,
-    "Margin of Safety (%)": margin_of_safety,
-    "CAGR (%)": cagr * 100,
-}
-
-summary_df = pd.DataFrame(list(summary_data.items()), columns=["Metric", "Value"])
-st.dataframe(summary_df.round(2), width='stretch')
+st.table(summary_df)
 
 # Optional: Show average future price across all years (like Excel's "Potensi Price")
 st.markdown("### 💡 Catatan")